@@ -0,0 +1,42 @@
+// Stitches the two halves of a 360 degrees sinogram into one 180 degrees
+// sinogram, one output element per thread. For an output column c, the
+// first half is read unchanged and the second half mirrored along the
+// detector axis:
+//   first    = data[m, j, c - first_shift]      for 0 <= c - first_shift < dz
+//   mirrored = data[n + m, j, src_end - c]      for 0 <= src_end - c < dz
+// Both are valid over the overlap region [dz - overlap, dz) only, where
+//   out[m, j, c] = w[k] * first + w[overlap - 1 - k] * mirrored
+// with k = c - (dz - overlap). Every input element is read at most once.
+// The (m, j) rows run along the y dimension of the grid in a grid-stride
+// loop, so gridDim.y can be capped below its 65535 limit.
+template <typename Type, typename WeightType>
+__global__ void sino_360_to_180(const Type *__restrict__ data,
+                                const WeightType *__restrict__ weights,
+                                Type *out,
+                                int n, int dy, int dz, int overlap,
+                                int first_shift, int src_end) {
+  const long c = blockDim.x * blockIdx.x + threadIdx.x;
+  const long nout = 2 * dz - overlap;
+
+  if (c >= nout)
+    return;
+
+  const long k = c - (dz - overlap);
+  for (long row = blockIdx.y; row < (long)n * dy; row += gridDim.y) {
+    const long m = row / dy;
+    const long j = row - m * dy;
+    const long long first_idx = (m * dy + j) * dz + c - first_shift;
+    const long long mirrored_idx = ((n + m) * dy + j) * dz + src_end - c;
+    const long long out_idx = row * nout + c;
+
+    if (k >= 0 && k < overlap) {
+      out[out_idx] = static_cast<Type>(weights[k] * data[first_idx] +
+                                       weights[overlap - 1 - k] *
+                                           data[mirrored_idx]);
+    } else if (c - first_shift >= 0 && c - first_shift < dz) {
+      out[out_idx] = data[first_idx];
+    } else {
+      out[out_idx] = data[mirrored_idx];
+    }
+  }
+}
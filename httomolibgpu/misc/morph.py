@@ -20,10 +20,13 @@
 # ---------------------------------------------------------------------------
 """Module for data type morphing functions"""
 
+import functools
+
 import cupy as cp 
 import numpy as np
 import nvtx
-from typing import Literal, Tuple
+from typing import Literal, Optional, Tuple
+from httomolibgpu.cuda_kernels import load_cuda_module
 from httomolibgpu.decorator import method_sino
 
 __all__ = [
@@ -35,21 +38,87 @@ def _calc_max_slices_sino_360_to_180(
     other_dims: Tuple[int, int], dtype: np.dtype, available_memory: int, **kwargs
 ) -> Tuple[int, np.dtype]:
     assert 'overlap' in kwargs, "Overlap not given"
-    overlap = int(np.round(kwargs['overlap']))
-    in_slice = np.prod(other_dims) * dtype.itemsize
+    overlap = int(round(kwargs['overlap']))
+    in_slice = other_dims[0] * other_dims[1] * dtype.itemsize
     out_slice = other_dims[0] * (other_dims[1] * 2 - overlap) / 2 * dtype.itemsize
-    # we have to leave this as 64bit to match tomopy?
-    weights = overlap * np.float64().nbytes
+    # weights are float32, or float64 for float64 input
+    weights = overlap * max(dtype.itemsize, 4)
 
     available_memory -= weights
-    return int(np.floor(available_memory / (in_slice + out_slice))), dtype
+    return int(available_memory // (in_slice + out_slice)), dtype
+
+
+# CUDA types of the data and of the blending weights for each supported dtype
+_kernel_types = {
+    "float32": ("float", "float"),
+    "float64": ("double", "double"),
+    "uint16": ("unsigned short", "float"),
+}
+_sino_360_to_180_module = load_cuda_module(
+    "sino_360_to_180",
+    name_expressions=[
+        f"sino_360_to_180<{t}, {w}>" for t, w in _kernel_types.values()
+    ],
+)
+
+
+@functools.lru_cache(maxsize=32)
+def _stitch_plan(
+    device_id: int,
+    n: int,
+    dy: int,
+    dz: int,
+    overlap: int,
+    rotation: str,
+    dtype_name: str,
+):
+    # kernel, launch dimensions, weights and scalar arguments of the stitching
+    # kernel, which only depend on the geometry and so are worked out once
+
+    # column shifts to read the first half unchanged and the second half mirrored
+    if rotation == "left":
+        # out[:, :, -dz + overlap :] = data[:n, :, overlap:]
+        # out[:, :, : dz - overlap] = data[n : 2 * n, :, overlap:][:, :, ::-1]
+        first_shift, src_end = dz - overlap, dz - 1
+        weights_range = (0, 1.0)
+    elif rotation == "right":
+        # out[:, :, : dz - overlap] = data[:n, :, : dz - overlap]
+        # out[:, :, -dz + overlap :] = data[n : 2 * n, :, : dz - overlap][:, :, ::-1]
+        first_shift, src_end = 0, 2 * dz - overlap - 1
+        weights_range = (1.0, 0)
+    else:
+        raise ValueError('rotation parameter must be either "left" or "right"')
 
+    ctype, wtype = _kernel_types[dtype_name]
+    kernel = _sino_360_to_180_module.get_function(f"sino_360_to_180<{ctype}, {wtype}>")
+    # with overlap == 0 there is nothing to blend and the kernel never reads
+    # the (empty) weights
+    weights = cp.linspace(
+        *weights_range, overlap, dtype=cp.float64 if wtype == "double" else cp.float32
+    )
+
+    block_x = 128
+    block_dims = (block_x, 1, 1)
+    grid_dims = ((2 * dz - overlap + block_x - 1) // block_x, min(n * dy, 65535), 1)
+    scalars = (
+        np.int32(n),
+        np.int32(dy),
+        np.int32(dz),
+        np.int32(overlap),
+        np.int32(first_shift),
+        np.int32(src_end),
+    )
+    return kernel, grid_dims, block_dims, weights, scalars
 
 
 @method_sino(_calc_max_slices_sino_360_to_180)
 @nvtx.annotate()
 def sino_360_to_180(
-    data: cp.ndarray, overlap: int = 0, rotation: Literal["left", "right"] = "left"
+    data: cp.ndarray,
+    overlap: int = 0,
+    rotation: Literal["left", "right"] = "left",
+    *,
+    out: Optional[cp.ndarray] = None,
 ) -> cp.ndarray:
     """
     Converts 0-360 degrees sinogram to a 0-180 sinogram.
@@ -59,12 +128,18 @@ def sino_360_to_180(
     Parameters
     ----------
     data : cp.ndarray
-        Input 3D data.
+        Input 3D data of float32, float64 or uint16 data type.
     overlap : scalar, optional
         Overlapping number of pixels.
     rotation : string, optional
         'left' if rotation center is close to the left of the
         field-of-view, 'right' otherwise.
+    out : cp.ndarray, optional
+        Preallocated output array of shape (dx // 2, dy, 2 * dz - overlap) and
+        the same data type as the input. If not given, a new array is allocated.
+        Keyword-only and meant for direct library callers only, it is not a
+        pipeline parameter.
+
     Returns
     -------
     cp.ndarray
@@ -75,7 +150,10 @@ def sino_360_to_180(
 
     dx, dy, dz = data.shape
 
-    overlap = int(np.round(overlap))
+    if data.dtype.name not in _kernel_types:
+        raise ValueError("The input data should be float32, float64 or uint16 data type")
+
+    overlap = int(round(overlap))
     if overlap >= dz:
         raise ValueError("overlap must be less than data.shape[2]")
     if overlap < 0:
@@ -83,25 +161,30 @@ def sino_360_to_180(
 
     n = dx // 2
 
-    out = cp.empty((n, dy, 2 * dz - overlap), dtype=data.dtype)
+    kernel, grid_dims, block_dims, weights, scalars = _stitch_plan(
+        cp.cuda.Device().id, n, dy, dz, overlap, rotation, data.dtype.name
+    )
 
-    if rotation == "left":
-        weights = cp.linspace(0, 1.0, overlap)
-        out[:, :, -dz + overlap :] = data[:n, :, overlap:]
-        out[:, :, : dz - overlap] = data[n : 2 * n, :, overlap:][:, :, ::-1]
-        out[:, :, dz - overlap : dz] = (
-            weights * data[:n, :, :overlap]
-            + (weights * data[n : 2 * n, :, :overlap])[:, :, ::-1]
-        )
-    elif rotation == "right":
-        weights = cp.linspace(1.0, 0, overlap)
-        out[:, :, : dz - overlap] = data[:n, :, :-overlap]
-        out[:, :, -dz + overlap :] = data[n : 2 * n, :, :-overlap][:, :, ::-1]
-        out[:, :, dz - overlap : dz] = (
-            weights * data[:n, :, -overlap:]
-            + (weights * data[n : 2 * n, :, -overlap:])[:, :, ::-1]
+    out_shape = (n, dy, 2 * dz - overlap)
+    if out is None:
+        with nvtx.annotate(f"alloc n={n} dy={dy} nz_out={2 * dz - overlap}", color="red"):
+            out = cp.empty(out_shape, dtype=data.dtype)
+    elif out.shape != out_shape or out.dtype != data.dtype:
+        raise ValueError(
+            f"out must have shape {out_shape} and dtype {data.dtype}, "
+            f"got {out.shape} and {out.dtype}"
         )
-    else:
-        raise ValueError('rotation parameter must be either "left" or "right"')
+    elif not out.flags.c_contiguous:
+        raise ValueError("out must be C-contiguous")
+
+    # an empty output would give an empty grid, which cannot be launched
+    if out.size == 0:
+        return out
+
+    # the kernel indexes the input assuming C order
+    data = cp.ascontiguousarray(data)
+
+    with nvtx.annotate(f"stitch n={n} dy={dy} dz={dz} overlap={overlap}", color="green"):
+        kernel(grid_dims, block_dims, (data, weights, out, *scalars))
 
     return out
@@ -20,7 +20,8 @@
 # ---------------------------------------------------------------------------
 """Module for tomographic reconstruction"""
 
-from typing import Optional, Tuple, Union
+import functools
+from typing import Callable, Optional, Tuple, Union
 
 import cupy as cp
 from cupy import float32, complex64
@@ -38,6 +39,109 @@ __all__ = [
 ]
 
 
+# FBP, SIRT and CGLS allocate from their own memory pool, so that their large
+# temporaries do not fragment the default pool used by the other methods.
+# The pool is released at the end of every call, except for the work areas of
+# the cuFFT plans created during the reconstruction: CuPy's FFT plan cache keeps
+# those plans alive across calls, so their work areas (about the size of the
+# FFT buffers of one slab) stay resident in this pool and are not visible in
+# the default pool. Clearing the plan cache with
+# cp.fft.config.get_plan_cache().clear() releases them.
+_recon_pool = cp.cuda.MemoryPool()
+
+
+def _run_in_recon_pool(reconstruct: Callable[[], cp.ndarray]) -> cp.ndarray:
+    """Run the reconstruction with all its allocations in the dedicated pool
+    and return the result copied into the default pool. The dedicated pool is
+    released afterwards, also if the reconstruction raises. The wrappers are
+    cached across calls, so they must be built before calling this."""
+    # blocks cached in the default pool by earlier methods cannot be reused by
+    # the dedicated pool, so give them back to the device first
+    cp.get_default_memory_pool().free_all_blocks()
+    try:
+        with cp.cuda.using_allocator(_recon_pool.malloc):
+            reconstruction = reconstruct()
+        # release the temporaries first, so that the copy does not add to the
+        # peak memory of the reconstruction
+        with nvtx.annotate("free_recon_pool", color="yellow"):
+            _recon_pool.free_all_blocks()
+        result = reconstruction.copy()
+        del reconstruction
+    finally:
+        with nvtx.annotate("free_recon_pool", color="yellow"):
+            _recon_pool.free_all_blocks()
+    return result
+
+
+# ToMoBAR is imported on first use only, as it is an optional dependency
+_RecToolsDIRCuPy = None
+_RecToolsIRCuPy = None
+
+
+def _get_rectools_dir():
+    global _RecToolsDIRCuPy
+    if _RecToolsDIRCuPy is None:
+        from tomobar.methodsDIR_CuPy import RecToolsDIRCuPy
+
+        _RecToolsDIRCuPy = RecToolsDIRCuPy
+    return _RecToolsDIRCuPy
+
+
+def _get_rectools_ir():
+    global _RecToolsIRCuPy
+    if _RecToolsIRCuPy is None:
+        from tomobar.methodsIR_CuPy import RecToolsIRCuPy
+
+        _RecToolsIRCuPy = RecToolsIRCuPy
+    return _RecToolsIRCuPy
+
+
+# ToMoBAR wrappers keyed by geometry, so that the ASTRA projection geometry
+# is only set up once for a series of slabs with the same geometry. The
+# angles are passed as raw bytes to make them hashable.
+@functools.lru_cache(maxsize=4)
+def _make_rectools(
+    iterative: bool,
+    DetectorsDimH: int,
+    DetectorsDimV: int,
+    CenterRotOffset: float,
+    objsize: int,
+    gpu_id: int,
+    angles_bytes: bytes,
+    angles_dtype: str,
+):
+    angles = np.frombuffer(angles_bytes, dtype=angles_dtype)
+    RecTools = _get_rectools_ir() if iterative else _get_rectools_dir()
+    return RecTools(DetectorsDimH=DetectorsDimH,  # Horizontal detector dimension
+                    DetectorsDimV=DetectorsDimV,  # Vertical detector dimension (3D case)
+                    CenterRotOffset=CenterRotOffset,  # Center of Rotation scalar or a vector
+                    AnglesVec=-angles,  # A vector of projection angles in radians
+                    ObjSize=objsize,  # Reconstructed object dimensions (scalar)
+                    device_projector=gpu_id,
+                    )
+
+
+def _get_rectools(
+    iterative: bool,
+    data: cp.ndarray,
+    angles: np.ndarray,
+    center: float,
+    objsize: int,
+    gpu_id: int,
+):
+    angles = np.ascontiguousarray(angles)
+    return _make_rectools(
+        iterative,
+        data.shape[2],
+        data.shape[1],
+        data.shape[2] / 2 - center - 0.5,
+        objsize,
+        gpu_id,
+        angles.tobytes(),
+        angles.dtype.str,
+    )
+
+
 def _calc_max_slices_FBP(
     non_slice_dims_shape: Tuple[int, int],
     dtype: np.dtype,
@@ -46,21 +150,29 @@ def _calc_max_slices_FBP(
 ) -> Tuple[int, np.dtype, Tuple[int, int]]:
     # we first run filtersync, and calc the memory for that
     DetectorsLengthH = non_slice_dims_shape[1]
-    in_slice_size = np.prod(non_slice_dims_shape) * dtype.itemsize
+    in_slice_size = non_slice_dims_shape[0] * non_slice_dims_shape[1] * dtype.itemsize
     filter_size = (DetectorsLengthH//2+1) * float32().itemsize
     freq_slice = non_slice_dims_shape[0] * (DetectorsLengthH//2+1) * complex64().itemsize
     fftplan_size = freq_slice * 2
-    filtered_in_data = np.prod(non_slice_dims_shape) * float32().itemsize
+    filtered_in_data = non_slice_dims_shape[0] * non_slice_dims_shape[1] * float32().itemsize
     # calculate the output shape
     objsize = kwargs['objsize']
     if objsize is None:
         objsize = DetectorsLengthH
     output_dims = (objsize, objsize)
     # astra backprojection will generate an output array 
-    astra_out_size = (np.prod(output_dims) * float32().itemsize)
+    astra_out_size = (objsize * objsize * float32().itemsize)
 
     available_memory -= filter_size
-    slices_max = available_memory // int(in_slice_size + filtered_in_data + freq_slice + fftplan_size + astra_out_size)
+    batch_size = kwargs.get('batch_size')
+    if batch_size is None:
+        slices_max = available_memory // int(in_slice_size + filtered_in_data + freq_slice + fftplan_size + astra_out_size)
+    else:
+        # the temporaries (including a contiguous copy of the input batch and
+        # the astra output for it) only exist for one batch at a time, while the
+        # output is held twice when it is copied out of the reconstruction pool
+        available_memory -= batch_size * int(in_slice_size + filtered_in_data + freq_slice + fftplan_size + astra_out_size)
+        slices_max = max(available_memory // int(in_slice_size + 2 * astra_out_size), 0)
     return (slices_max, float32(), output_dims)
 
 
@@ -73,6 +185,7 @@ def FBP(
     center: Optional[float] = None,
     objsize: Optional[int] = None,
     gpu_id: int = 0,
+    batch_size: Optional[int] = None,
 ) -> cp.ndarray:
     """
     Perform Filtered Backprojection (FBP) reconstruction using ASTRA toolbox and ToMoBAR wrappers.
@@ -90,29 +203,49 @@ def FBP(
         The size in pixels of the reconstructed object.
     gpu_id : int, optional
         A GPU device index to perform operation on.
+    batch_size : int, optional
+        Reconstruct the slices in batches of this size, reusing the same
+        ToMoBAR wrapper, to limit the memory taken by temporaries. By default
+        all slices are reconstructed at once.
 
     Returns
     -------
     cp.ndarray
         The FBP reconstructed volume as a CuPy array.
     """
-    from tomobar.methodsDIR_CuPy import RecToolsDIRCuPy
-
     if center is None:
         center = data.shape[2] // 2  # making a crude guess
     if objsize is None:
         objsize = data.shape[2]
-        
-    RecToolsCP = RecToolsDIRCuPy(DetectorsDimH=data.shape[2],  # Horizontal detector dimension
-                                 DetectorsDimV=data.shape[1],  # Vertical detector dimension (3D case)
-                                 CenterRotOffset=data.shape[2] / 2 - center - 0.5,  # Center of Rotation scalar or a vector
-                                 AnglesVec=-angles,  # A vector of projection angles in radians
-                                 ObjSize=objsize,  # Reconstructed object dimensions (scalar)
-                                 device_projector=gpu_id,
-                                 )
-    reconstruction = RecToolsCP.FBP3D(data)
-    cp._default_memory_pool.free_all_blocks()
-    return reconstruction
+
+    if batch_size is not None and batch_size < 1:
+        raise ValueError("batch_size must be a positive integer")
+    batched = batch_size is not None and batch_size < data.shape[1]
+
+    with nvtx.annotate("RecTools.init", color="red"):
+        if not batched:
+            RecToolsCP = _get_rectools(False, data, angles, center, objsize, gpu_id)
+        else:
+            # all full batches share one wrapper, only the last one may differ
+            RecToolsBatches = [
+                _get_rectools(
+                    False, data[:, i : i + batch_size, :], angles, center, objsize, gpu_id
+                )
+                for i in range(0, data.shape[1], batch_size)
+            ]
+
+    def _reconstruct() -> cp.ndarray:
+        if not batched:
+            with nvtx.annotate(f"FBP3D shape={data.shape}", color="green"):
+                return RecToolsCP.FBP3D(data)
+        reconstruction = cp.empty((data.shape[1], objsize, objsize), dtype=float32)
+        for RecToolsBatch, i in zip(RecToolsBatches, range(0, data.shape[1], batch_size)):
+            batch = cp.ascontiguousarray(data[:, i : i + batch_size, :])
+            with nvtx.annotate(f"FBP3D shape={batch.shape}", color="green"):
+                reconstruction[i : i + batch_size] = RecToolsBatch.FBP3D(batch)
+        return reconstruction
+
+    return _run_in_recon_pool(_reconstruct)
 
 ## %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%  ##
 
@@ -129,8 +262,8 @@ def _calc_max_slices_SIRT(
     output_dims = (objsize, objsize) 
     
     # input/output
-    data_out = np.prod(non_slice_dims_shape) * dtype.itemsize
-    x_rec = np.prod(output_dims) * dtype.itemsize
+    data_out = non_slice_dims_shape[0] * non_slice_dims_shape[1] * dtype.itemsize
+    x_rec = objsize * objsize * dtype.itemsize
     # preconditioning matrices R and C
     R_mat = data_out
     C_mat = x_rec
@@ -182,25 +315,21 @@ def SIRT(
     cp.ndarray
         The SIRT reconstructed volume as a CuPy array.
     """
-    from tomobar.methodsIR_CuPy import RecToolsIRCuPy
-
     if center is None:
         center = data.shape[2] // 2  # making a crude guess
     if objsize is None:
         objsize = data.shape[2]
-        
-    RecToolsCP = RecToolsIRCuPy(DetectorsDimH=data.shape[2],  # Horizontal detector dimension
-                                 DetectorsDimV=data.shape[1],  # Vertical detector dimension (3D case)
-                                 CenterRotOffset=data.shape[2] / 2 - center - 0.5,  # Center of Rotation scalar or a vector
-                                 AnglesVec=-angles,  # A vector of projection angles in radians
-                                 ObjSize=objsize,  # Reconstructed object dimensions (scalar)
-                                 device_projector=gpu_id,
-                                 )
+
     _data_ = {"projection_norm_data": data}  # data dictionary
     _algorithm_ = {"iterations": iterations, "nonnegativity": nonnegativity}
-    reconstruction = RecToolsCP.SIRT(_data_, _algorithm_)
-    cp._default_memory_pool.free_all_blocks()
-    return reconstruction
+    with nvtx.annotate("RecTools.init", color="red"):
+        RecToolsCP = _get_rectools(True, data, angles, center, objsize, gpu_id)
+
+    def _reconstruct() -> cp.ndarray:
+        with nvtx.annotate(f"SIRT shape={data.shape} iterations={iterations}", color="green"):
+            return RecToolsCP.SIRT(_data_, _algorithm_)
+
+    return _run_in_recon_pool(_reconstruct)
 
 ## %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%  ##
 def _calc_max_slices_CGLS(
@@ -216,8 +345,8 @@ def _calc_max_slices_CGLS(
     output_dims = (objsize, objsize) 
     
     # input/output
-    data_out = np.prod(non_slice_dims_shape) * dtype.itemsize
-    x_rec = np.prod(output_dims) * dtype.itemsize
+    data_out = non_slice_dims_shape[0] * non_slice_dims_shape[1] * dtype.itemsize
+    x_rec = objsize * objsize * dtype.itemsize
     # d and r vectors    
     d = x_rec
     r = data_out
@@ -268,24 +397,20 @@ def CGLS(
     cp.ndarray
         The CGLS reconstructed volume as a CuPy array.
     """
-    from tomobar.methodsIR_CuPy import RecToolsIRCuPy
-
     if center is None:
         center = data.shape[2] // 2  # making a crude guess
     if objsize is None:
         objsize = data.shape[2]
-        
-    RecToolsCP = RecToolsIRCuPy(DetectorsDimH=data.shape[2],  # Horizontal detector dimension
-                                 DetectorsDimV=data.shape[1],  # Vertical detector dimension (3D case)
-                                 CenterRotOffset=data.shape[2] / 2 - center - 0.5,  # Center of Rotation scalar or a vector
-                                 AnglesVec=-angles,  # A vector of projection angles in radians
-                                 ObjSize=objsize,  # Reconstructed object dimensions (scalar)
-                                 device_projector=gpu_id,
-                                 )
+
     _data_ = {"projection_norm_data": data}  # data dictionary
     _algorithm_ = {"iterations": iterations, "nonnegativity": nonnegativity}
-    reconstruction = RecToolsCP.CGLS(_data_, _algorithm_)
-    cp._default_memory_pool.free_all_blocks()
-    return reconstruction
+    with nvtx.annotate("RecTools.init", color="red"):
+        RecToolsCP = _get_rectools(True, data, angles, center, objsize, gpu_id)
+
+    def _reconstruct() -> cp.ndarray:
+        with nvtx.annotate(f"CGLS shape={data.shape} iterations={iterations}", color="green"):
+            return RecToolsCP.CGLS(_data_, _algorithm_)
+
+    return _run_in_recon_pool(_reconstruct)
 
 ## %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%  ##
\ No newline at end of file
@@ -3,6 +3,7 @@
 import os
 
 import cupy as cp
+import cupyx
 import numpy as np
 import pytest
 
@@ -56,6 +57,25 @@ def data_file(test_data_path):
     return np.load(in_file)
 
 
+def _random_sino_pinned(shape):
+    # pinned host memory, so that tests can upload it without staging copies
+    host = cupyx.empty_pinned(shape, dtype=np.float32)
+    host[...] = np.random.default_rng(12345).random(shape, dtype=np.float32) * 2.0 + 0.001
+    return host
+
+
+# random data is generated once per session - tests must not modify it in-place,
+# so take a copy when passing it to methods that do
+@pytest.fixture(scope="session")
+def host_random_sino():
+    return _random_sino_pinned((181, 5, 256))
+
+
+@pytest.fixture(scope="session")
+def host_random_sino_large():
+    return _random_sino_pinned((1801, 5, 2560))
+
+
 @pytest.fixture
 def ensure_clean_memory():
     cp.get_default_memory_pool().free_all_blocks()
@@ -3,6 +3,7 @@ import cupy as cp
 import numpy as np
 from cupy.cuda import nvtx
 import pytest
+from numpy.testing import assert_allclose
 #from tomopy.misc.morph import sino_360_to_180 as tomopy_sino_360_to_180
 from httomolibgpu.misc.morph import sino_360_to_180
 
@@ -55,6 +56,109 @@ def test_sino_360_to_180_wrong_dims(ensure_clean_memory, shape):
         sino_360_to_180(cp.ones(shape, dtype=cp.float32))
 
 
+@pytest.mark.parametrize("dtype", [cp.float16, cp.int32, cp.uint8])
+@cp.testing.gpu
+def test_sino_360_to_180_wrong_dtype(ensure_clean_memory, dtype):
+    with pytest.raises(ValueError):
+        sino_360_to_180(cp.ones((10, 10, 10), dtype=dtype))
+
+
+def _sino_360_to_180_reference(data, overlap, rotation):
+    # plain numpy version of the stitching, used to check the GPU kernels
+    dx, dy, dz = data.shape
+    n = dx // 2
+    out = np.empty((n, dy, 2 * dz - overlap), dtype=data.dtype)
+    if rotation == "left":
+        weights = np.linspace(0, 1.0, overlap)
+        out[:, :, -dz + overlap :] = data[:n, :, overlap:]
+        out[:, :, : dz - overlap] = data[n : 2 * n, :, overlap:][:, :, ::-1]
+        out[:, :, dz - overlap : dz] = (
+            weights * data[:n, :, :overlap]
+            + (weights * data[n : 2 * n, :, :overlap])[:, :, ::-1]
+        )
+    else:
+        weights = np.linspace(1.0, 0, overlap)
+        out[:, :, : dz - overlap] = data[:n, :, : dz - overlap]
+        out[:, :, -dz + overlap :] = data[n : 2 * n, :, : dz - overlap][:, :, ::-1]
+        out[:, :, dz - overlap : dz] = (
+            weights * data[:n, :, -overlap:]
+            + (weights * data[n : 2 * n, :, -overlap:])[:, :, ::-1]
+        )
+    return out
+
+
+@pytest.mark.parametrize(
+    "dtype, tol",
+    [
+        # the overlap is blended in single precision, the reference in double
+        (np.float32, dict(rtol=1e-5, atol=1e-4)),
+        (np.float64, dict(rtol=1e-12, atol=1e-12)),
+        # the blend is truncated back to uint16, which may round differently
+        # from the double precision reference
+        (np.uint16, dict(rtol=0, atol=1)),
+    ],
+)
+@pytest.mark.parametrize("overlap", [0, 1, 3, 15, 32])
+@pytest.mark.parametrize("rotation", ["left", "right"])
+@cp.testing.gpu
+def test_sino_360_to_180_vs_reference(ensure_clean_memory, overlap, rotation, dtype, tol):
+    np.random.seed(12345)
+    if dtype == np.uint16:
+        data_host = np.random.randint(0, 60000, size=(123, 54, 128)).astype(dtype)
+    else:
+        data_host = (
+            np.random.random_sample(size=(123, 54, 128)).astype(dtype) * 200.0 - 100.0
+        )
+
+    out = sino_360_to_180(cp.asarray(data_host), overlap, rotation).get()
+
+    assert out.dtype == dtype
+    assert out.shape == (61, 54, 2 * 128 - overlap)
+    assert_allclose(
+        out.astype(np.float64),
+        _sino_360_to_180_reference(data_host, overlap, rotation).astype(np.float64),
+        **tol,
+    )
+
+
+@cp.testing.gpu
+def test_sino_360_to_180_out(ensure_clean_memory):
+    data = cp.asarray(np.random.random_sample(size=(20, 5, 30)).astype(np.float32))
+    out = cp.empty((10, 5, 2 * 30 - 4), dtype=cp.float32)
+
+    res = sino_360_to_180(data, overlap=4, out=out)
+
+    assert res is out
+    assert_allclose(out.get(), sino_360_to_180(data, overlap=4).get())
+
+    with pytest.raises(ValueError):
+        sino_360_to_180(data, overlap=5, out=out)
+
+
+@pytest.mark.parametrize("shape", [(1, 5, 30), (20, 0, 30)])
+@cp.testing.gpu
+def test_sino_360_to_180_empty(ensure_clean_memory, shape):
+    data = cp.ones(shape, dtype=cp.float32)
+
+    out = sino_360_to_180(data, overlap=4)
+
+    assert out.shape == (shape[0] // 2, shape[1], 2 * 30 - 4)
+
+
+@pytest.mark.parametrize("rotation", ["left", "right"])
+@cp.testing.gpu
+def test_sino_360_to_180_many_rows(ensure_clean_memory, rotation):
+    # more rows than the 65535 limit of the grid's y dimension
+    np.random.seed(12345)
+    data_host = np.random.random_sample(size=(4, 40000, 6)).astype(np.float32)
+
+    out = sino_360_to_180(cp.asarray(data_host), 2, rotation).get()
+
+    assert_allclose(
+        out, _sino_360_to_180_reference(data_host, 2, rotation), rtol=1e-5, atol=1e-6
+    )
+
+
 def test_sino_360_to_180_meta():
     assert sino_360_to_180.meta.gpu is True
     assert sino_360_to_180.meta.pattern == 'sinogram'
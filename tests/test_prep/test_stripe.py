@@ -64,12 +64,9 @@ def test_remove_stripe_ti_on_flats(host_flats):
 
 
 @cp.testing.gpu
-def test_remove_stripe_ti_numpy_vs_cupy_on_random_data():
-    host_data = np.random.random_sample(size=(181, 5, 256)).astype(np.float32) * 2.0
-    corrected_host_data = remove_stripe_ti(np.copy(host_data))
-    corrected_data = remove_stripe_ti(
-        cp.copy(cp.asarray(host_data, dtype=cp.float32))
-    ).get()
+def test_remove_stripe_ti_numpy_vs_cupy_on_random_data(host_random_sino):
+    corrected_host_data = remove_stripe_ti(np.copy(host_random_sino))
+    corrected_data = remove_stripe_ti(cp.asarray(host_random_sino)).get()
 
     assert_allclose(np.sum(corrected_data), np.sum(corrected_host_data), rtol=1e-6)
     assert_allclose(
@@ -115,32 +112,32 @@ def test_stripe_removal_sorting_cupy_meta(data, flats, darks):
 
 @cp.testing.gpu
 @cp.testing.numpy_cupy_allclose(rtol=1e-6)
-def test_stripe_removal_sorting_numpy_vs_cupy_on_random_data(ensure_clean_memory, xp):
-    np.random.seed(12345)
-    data = np.random.random_sample(size=(181, 5, 256)).astype(np.float32) * 2.0 + 0.001
-    data = xp.asarray(data)
+def test_stripe_removal_sorting_numpy_vs_cupy_on_random_data(
+    ensure_clean_memory, host_random_sino, xp
+):
+    data = xp.asarray(np.copy(host_random_sino))
     return xp.asarray(remove_stripe_based_sorting(data))
 
 
 @cp.testing.gpu
 @pytest.mark.perf
-def test_stripe_removal_sorting_cupy_performance(ensure_clean_memory):
-    data_host = (
-        np.random.random_sample(size=(1801, 5, 2560)).astype(np.float32) * 2.0 + 0.001
-    )
-    data = cp.asarray(data_host, dtype=np.float32)
+def test_stripe_removal_sorting_cupy_performance(ensure_clean_memory, host_random_sino_large):
+    data = cp.asarray(host_random_sino_large)
 
     # do a cold run first
     remove_stripe_based_sorting(cp.copy(data))
 
+    # have to take copies, as data is modified in-place - done upfront so
+    # that the timed region only covers the method itself
+    data_copies = [cp.copy(data) for _ in range(10)]
+
     dev = cp.cuda.Device()
     dev.synchronize()
 
     start = time.perf_counter_ns()
     nvtx.RangePush("Core")
-    for _ in range(10):
-        # have to take copy, as data is modified in-place
-        remove_stripe_based_sorting(cp.copy(data))
+    for data_copy in data_copies:
+        remove_stripe_based_sorting(data_copy)
     nvtx.RangePop()
     dev.synchronize()
     duration_ms = float(time.perf_counter_ns() - start) * 1e-6 / 10
@@ -150,23 +147,23 @@ def test_stripe_removal_sorting_cupy_performance(ensure_clean_memory):
 
 @cp.testing.gpu
 @pytest.mark.perf
-def test_remove_stripe_ti_performance(ensure_clean_memory):
-    data_host = (
-        np.random.random_sample(size=(1801, 5, 2560)).astype(np.float32) * 2.0 + 0.001
-    )
-    data = cp.asarray(data_host, dtype=np.float32)
+def test_remove_stripe_ti_performance(ensure_clean_memory, host_random_sino_large):
+    data = cp.asarray(host_random_sino_large)
 
     # do a cold run first
     remove_stripe_ti(cp.copy(data))
 
+    # have to take copies, as data is modified in-place - done upfront so
+    # that the timed region only covers the method itself
+    data_copies = [cp.copy(data) for _ in range(10)]
+
     dev = cp.cuda.Device()
     dev.synchronize()
 
     start = time.perf_counter_ns()
     nvtx.RangePush("Core")
-    for _ in range(10):
-        # have to take copy, as data is modified in-place
-        remove_stripe_ti(cp.copy(data))
+    for data_copy in data_copies:
+        remove_stripe_ti(data_copy)
     nvtx.RangePop()
     dev.synchronize()
     duration_ms = float(time.perf_counter_ns() - start) * 1e-6 / 10
@@ -46,6 +46,39 @@ def test_reconstruct_FBP_2(data, flats, darks, ensure_clean_memory):
     assert recon_data.dtype == np.float32
 
 
+@cp.testing.gpu
+def test_reconstruct_FBP_batched(data, flats, darks, ensure_clean_memory):
+    normalized = normalize_cupy(data, flats, darks, cutoff=10, minus_log=True)
+    angles = np.linspace(0.0 * np.pi / 180.0, 180.0 * np.pi / 180.0, data.shape[0])
+
+    recon_data = FBP(normalized, angles, 79.5).get()
+    recon_data_batched = FBP(normalized, angles, 79.5, batch_size=50).get()
+
+    assert recon_data_batched.shape == recon_data.shape
+    assert recon_data_batched.dtype == np.float32
+    assert_allclose(recon_data_batched, recon_data, rtol=1e-5, atol=1e-6)
+
+
+@cp.testing.gpu
+def test_reconstruct_FBP_default_pool_cached(data, flats, darks, ensure_clean_memory):
+    normalized = normalize_cupy(data, flats, darks, cutoff=10, minus_log=True)
+    angles = np.linspace(0.0 * np.pi / 180.0, 180.0 * np.pi / 180.0, data.shape[0])
+    expected = FBP(normalized, angles, 79.5).get()
+
+    # leave most of the device memory cached in the default pool, as an
+    # earlier method in the pipeline would
+    pool = cp.get_default_memory_pool()
+    free_mem = cp.cuda.Device().mem_info[0]
+    block = cp.empty(int(free_mem * 0.9), dtype=cp.uint8)
+    del block
+    assert pool.free_bytes() >= int(free_mem * 0.9)
+
+    recon_data = FBP(normalized, angles, 79.5)
+
+    assert pool.free_bytes() < int(free_mem * 0.9)
+    assert_allclose(recon_data.get(), expected, rtol=1e-6, atol=1e-7)
+
+
 @cp.testing.gpu
 def test_reconstruct_FBP_hook(data, flats, darks, ensure_clean_memory):
     normalized = normalize_cupy(data, flats, darks, cutoff=10, minus_log=True)
@@ -80,6 +113,48 @@ def test_reconstruct_FBP_hook(data, flats, darks, ensure_clean_memory):
     assert_allclose(np.mean(recon_data, axis=(1, 2)).sum(), 0.10210582, rtol=1e-6)
 
 
+@pytest.mark.parametrize("batch_size", [0, -5])
+@cp.testing.gpu
+def test_reconstruct_FBP_invalid_batch_size(data, ensure_clean_memory, batch_size):
+    angles = np.linspace(0.0 * np.pi / 180.0, 180.0 * np.pi / 180.0, data.shape[0])
+    with pytest.raises(ValueError):
+        FBP(cp.asarray(data, dtype=cp.float32), angles, 79.5, batch_size=batch_size)
+
+
+@cp.testing.gpu
+def test_reconstruct_FBP_batched_hook(data, flats, darks, ensure_clean_memory):
+    normalized = normalize_cupy(data, flats, darks, cutoff=10, minus_log=True)
+
+    cp.get_default_memory_pool().free_all_blocks()
+    cache = cp.fft.config.get_plan_cache()
+    cache.clear()
+
+    objrecon_size = data.shape[2]
+    batch_size = 16
+    hook = MaxMemoryHook(normalized.size * normalized.itemsize)
+    with hook:
+        recon_data = FBP(
+            normalized,
+            np.linspace(0.0 * np.pi / 180.0, 180.0 * np.pi / 180.0, data.shape[0]),
+            79.5,
+            objsize=objrecon_size,
+            batch_size=batch_size,
+        )
+
+    # make sure estimator function is within range (80% min, 100% max)
+    max_mem = hook.max_mem
+    actual_slices = data.shape[1]
+    estimated_slices, dtype_out, output_dims = FBP.meta.calc_max_slices(1,
+                                                       (data.shape[0], data.shape[2]),
+                                                       normalized.dtype,
+                                                       max_mem,
+                                                       objsize=objrecon_size,
+                                                       batch_size=batch_size)
+    assert estimated_slices <= actual_slices
+    assert estimated_slices / actual_slices >= 0.8
+    assert recon_data.shape == (actual_slices, objrecon_size, objrecon_size)
+
+
 @cp.testing.gpu
 def test_reconstruct_SIRT(data, flats, darks, ensure_clean_memory):
     objrecon_size = data.shape[2]